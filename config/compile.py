@@ -0,0 +1,31 @@
+# config/compile.py
+
+from dotenv import load_dotenv
+from pathlib import Path
+import os
+import py_compile
+from config.config import ENV_KEYS
+
+CACHE_PATH = Path(__file__).with_name('config_cache.py')
+
+
+def compile_config(path=CACHE_PATH):
+    """將解析後的環境變數寫成 Python 常量，之後啟動時直接匯入"""
+    load_dotenv()
+
+    lines = [
+        '# config/config_cache.py',
+        '# 由 python -m config.compile 自動生成，請勿手動修改',
+        '',
+    ]
+    for key in ENV_KEYS:
+        lines.append(f"{key} = {os.getenv(key)!r}")
+
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    # 預先編譯成 bytecode，匯入時無需再次解析
+    py_compile.compile(str(path))
+    return path
+
+
+if __name__ == "__main__":
+    print(f"已生成設定快取: {compile_config()}")
@@ -1,120 +1,186 @@
 # config/config.py
 
 from dotenv import load_dotenv
+from functools import lru_cache
+from typing import Final
 import os
 from pathlib import Path
+from types import MappingProxyType
+
+
+def _freeze(value):
+    """將設定轉為唯讀結構：dict -> MappingProxyType，list -> tuple"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+# === 需要從環境變數讀取的鍵 ===
+ENV_KEYS: Final = (
+    'OPENAI_API_KEY',
+)
+
+# === 交易對設置 ===
+DEFAULT_SYMBOL: Final = "BTCUSDT"
+SYMBOLS_TO_MONITOR: Final = _freeze([
+    "BTCUSDT",  # 比特幣
+    "ETHUSDT",  # 以太坊
+    "SOLUSDT",  # 索拉納
+])
+
+# === Binance REST 設置 ===
+BINANCE: Final = _freeze({
+    'base_url': 'https://api.binance.com',
+    'klines_limit': 1000,   # 每次請求最多K線數
+    'timeout': 10           # 請求超時（秒）
+})
+
+# === 時間框架設置 ===
+TIMEFRAMES: Final = _freeze({
+    'default': '1d',    # 預設時間框架
+    'available': [      # 可用的時間框架
+        '1m', '3m', '5m', '15m', '30m',  # 分鐘
+        '1h', '2h', '4h', '6h', '8h', '12h',  # 小時
+        '1d', '3d',  # 天
+        '1w', '1M'   # 週和月
+    ]
+})
+
+# === 分析設置 ===
+ANALYSIS: Final = _freeze({
+    'default_days': 30,     # 預設分析天數
+    'max_days': 365,        # 最大分析天數
+    'update_interval': 3600  # 更新間隔（秒）
+})
+
+# === 技術指標參數 ===
+INDICATORS: Final = _freeze({
+    'MA': {
+        'periods': [5, 10, 20, 50, 100, 200],  # MA週期
+        'default_period': 20
+    },
+    'RSI': {
+        'period': 14,
+        'overbought': 70,
+        'oversold': 30
+    },
+    'MACD': {
+        'fast_period': 12,
+        'slow_period': 26,
+        'signal_period': 9
+    },
+    'Bollinger': {
+        'period': 20,
+        'std_dev': 2
+    }
+})
+
+# === 趨勢分析參數 ===
+TREND: Final = _freeze({
+    'min_points': 5,        # 趨勢線最小點數
+    'breakout_threshold': 0.02,  # 突破閾值 (2%)
+    'confirmation_periods': 3     # 確認期數
+})
+
+# === OpenAI 設置 ===
+OPENAI: Final = _freeze({
+    'model': 'gpt-4',
+    'temperature': 0.7,
+    'max_tokens': 1000
+})
+
+# === 輸出設置 ===
+OUTPUT: Final = _freeze({
+    'save_analysis': True,
+    'output_path': Path('./output'),
+    'formats': ['txt', 'json']
+})
+
+# === 警報設置 ===
+ALERTS: Final = _freeze({
+    'enabled': True,
+    'price_change_threshold': 0.05,  # 5%
+    'volume_spike_threshold': 3,      # 3倍標準差
+    'rsi_alerts': {
+        'oversold': 30,
+        'overbought': 70
+    },
+    'trend_break_alerts': True,
+    'throttle': {
+        'capacity': 1,          # 每個 (交易對, 類型) 可連續發出的警報數
+        'refill_seconds': 300   # 每補充一個額度所需秒數
+    }
+})
+
+# === 日誌設置 ===
+LOGGING: Final = _freeze({
+    'enabled': True,
+    'level': 'INFO',
+    'log_file': 'crypto_analysis.log',
+    'max_file_size': 1024 * 1024 * 10,  # 10 MB
+    'backup_count': 5
+})
+
+
+@lru_cache(maxsize=None)
+def load_env():
+    """載入環境變數（每個進程只解析一次）"""
+    try:
+        # 由 python -m config.compile 生成，存在時不再解析 .env
+        from config import config_cache
+    except ImportError:
+        config_cache = None
+
+    if config_cache is None and not os.environ.get('CONFIG_CACHED'):
+        load_dotenv()
+
+    return {
+        key: os.environ.get(key, getattr(config_cache, key, None))
+        for key in ENV_KEYS
+    }
+
 
 class Config:
     def __init__(self):
         # 載入環境變數
-        load_dotenv()
+        env = load_env()
         
         # === API Keys ===
-        self.OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
-        
-        # === 交易對設置 ===
-        self.DEFAULT_SYMBOL = "BTCUSDT"
-        self.SYMBOLS_TO_MONITOR = [
-            "BTCUSDT",  # 比特幣
-            "ETHUSDT",  # 以太坊
-            "SOLUSDT",  # 索拉納
-        ]
-        
-        # === 時間框架設置 ===
-        self.TIMEFRAMES = {
-            'default': '1d',    # 預設時間框架
-            'available': [      # 可用的時間框架
-                '1m', '3m', '5m', '15m', '30m',  # 分鐘
-                '1h', '2h', '4h', '6h', '8h', '12h',  # 小時
-                '1d', '3d',  # 天
-                '1w', '1M'   # 週和月
-            ]
-        }
-        
-        # === 分析設置 ===
-        self.ANALYSIS = {
-            'default_days': 30,     # 預設分析天數
-            'max_days': 365,        # 最大分析天數
-            'update_interval': 3600  # 更新間隔（秒）
-        }
-        
-        # === 技術指標參數 ===
-        self.INDICATORS = {
-            'MA': {
-                'periods': [5, 10, 20, 50, 100, 200],  # MA週期
-                'default_period': 20
-            },
-            'RSI': {
-                'period': 14,
-                'overbought': 70,
-                'oversold': 30
-            },
-            'MACD': {
-                'fast_period': 12,
-                'slow_period': 26,
-                'signal_period': 9
-            },
-            'Bollinger': {
-                'period': 20,
-                'std_dev': 2
-            }
-        }
-        
-        # === 趨勢分析參數 ===
-        self.TREND = {
-            'min_points': 5,        # 趨勢線最小點數
-            'breakout_threshold': 0.02,  # 突破閾值 (2%)
-            'confirmation_periods': 3     # 確認期數
-        }
-        
-        # === OpenAI 設置 ===
-        self.OPENAI = {
-            'model': 'gpt-4',
-            'temperature': 0.7,
-            'max_tokens': 1000
-        }
-        
-        # === 輸出設置 ===
-        self.OUTPUT = {
-            'save_analysis': True,
-            'output_path': Path('./output'),
-            'formats': ['txt', 'json']
-        }
+        self.OPENAI_API_KEY = env['OPENAI_API_KEY']
         
-        # === 警報設置 ===
-        self.ALERTS = {
-            'enabled': True,
-            'price_change_threshold': 0.05,  # 5%
-            'volume_spike_threshold': 3,      # 3倍標準差
-            'rsi_alerts': {
-                'oversold': 30,
-                'overbought': 70
-            },
-            'trend_break_alerts': True
-        }
+        # === 其餘設置直接引用唯讀的模組常量，可安全共用 ===
+        self.DEFAULT_SYMBOL = DEFAULT_SYMBOL
+        self.SYMBOLS_TO_MONITOR = SYMBOLS_TO_MONITOR
+        self.BINANCE = BINANCE
+        self.TIMEFRAMES = TIMEFRAMES
+        self.ANALYSIS = ANALYSIS
+        self.INDICATORS = INDICATORS
+        self.TREND = TREND
+        self.OPENAI = OPENAI
+        self.OUTPUT = OUTPUT
+        self.ALERTS = ALERTS
+        self.LOGGING = LOGGING
         
-        # === 日誌設置 ===
-        self.LOGGING = {
-            'enabled': True,
-            'level': 'INFO',
-            'log_file': 'crypto_analysis.log',
-            'max_file_size': 1024 * 1024 * 10,  # 10 MB
-            'backup_count': 5
-        }
+        # 常用查詢改用雜湊集合
+        self._SYMBOLS_SET = frozenset(self.SYMBOLS_TO_MONITOR)
+        self._TF_SET = frozenset(self.TIMEFRAMES['available'])
+        self._MA_PERIODS_SET = frozenset(self.INDICATORS['MA']['periods'])
         
     def get_timeframe(self, timeframe=None):
         """獲取有效的時間框架"""
-        if timeframe and timeframe in self.TIMEFRAMES['available']:
+        if timeframe and timeframe in self._TF_SET:
             return timeframe
         return self.TIMEFRAMES['default']
     
     def is_valid_symbol(self, symbol):
         """檢查交易對是否有效"""
-        return symbol in self.SYMBOLS_TO_MONITOR
+        return symbol in self._SYMBOLS_SET
     
     def get_ma_periods(self, period=None):
         """獲取MA週期"""
-        if period and period in self.INDICATORS['MA']['periods']:
+        if period and period in self._MA_PERIODS_SET:
             return period
         return self.INDICATORS['MA']['default_period']
     
@@ -1,8 +1,11 @@
+import asyncio
 import time
 import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import logging
-from rich.console import Console
+from rich.console import Console, Group
 from rich.table import Table
 from rich.live import Live
 from rich.panel import Panel
@@ -10,6 +13,28 @@ from rich import box
 from config.config import Config
 from src.analyzer import CryptoTrendAnalyzer
 
+class TokenBucket:
+    """令牌桶限流器"""
+    def __init__(self, capacity, refill_seconds):
+        self.capacity = capacity
+        self.refill_seconds = refill_seconds
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+        
+    def consume(self):
+        """嘗試取得一個令牌，成功返回 True"""
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity,
+            self.tokens + (now - self.last_refill) / self.refill_seconds
+        )
+        self.last_refill = now
+        
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
 class CryptoRealtimeAgent:
     def __init__(self):
         # 保持原有的初始化
@@ -20,25 +45,38 @@ class CryptoRealtimeAgent:
         self.current_prices = {}
         self.price_changes = {}
         self.last_analysis = {}
-        self.alerts = []
-        self.processed_alerts = set()
+        self.alerts = deque(maxlen=5)  # 只保留最新的5條
+        self._buckets = {}  # (交易對, 警報類型) -> TokenBucket
+        self._last_alert = {}  # (交易對, 警報類型) -> 最近一條警報
+        
+        # 數據變化時才重新生成表格
+        self._dirty = True
+        
+        # 分析請求為 I/O 密集，使用線程池並行處理
+        self._pool = ThreadPoolExecutor(max_workers=8)
 
         # 初始化日誌
         logging.basicConfig(
-            level=logging.INFO,
+            level=getattr(logging, self.config.LOGGING['level']),
             format='%(asctime)s - %(levelname)s - %(message)s'
         )
         
-    def update_prices(self):
+    async def update_prices(self):
         """更新即時價格"""
+        # 單次請求獲取所有交易對價格（在線程池中執行，不阻塞事件循環）
+        loop = asyncio.get_running_loop()
+        prices = await loop.run_in_executor(
+            self._pool, self.analyzer.get_realtime_prices, self.config.SYMBOLS_TO_MONITOR
+        )
+        
         for symbol in self.config.SYMBOLS_TO_MONITOR:
             try:
                 # 獲取當前價格
-                price = self.analyzer.get_realtime_price(symbol)
+                price = prices.get(symbol)
                 if price:
                     # 計算價格變化
                     old_price = self.current_prices.get(symbol, {}).get('price')
-                    if old_price:
+                    if old_price and old_price != 'N/A':
                         change = ((price - old_price) / old_price) * 100
                     else:
                         change = 0
@@ -59,6 +97,13 @@ class CryptoRealtimeAgent:
                     # 檢查價格警報
                     self.check_price_alerts(symbol, price)
                     
+                elif symbol not in self.current_prices:
+                    # 批量請求失敗或缺少該交易對，尚無有效價格時標記為 N/A
+                    self.current_prices[symbol] = {
+                        'price': 'N/A',
+                        'timestamp': datetime.now()
+                    }
+                    
             except Exception as e:
                 logging.error(f"更新 {symbol} 價格時出錯: {e}")
                 # 保持最後一次有效的價格
@@ -67,39 +112,58 @@ class CryptoRealtimeAgent:
                         'price': 'N/A',
                         'timestamp': datetime.now()
                     }
+        
+        self._dirty = True
 
-    def add_alert(self, message, alert_id):
-        """添加新警報"""
-        if alert_id not in self.processed_alerts:
-            # 創建新警報
-            new_alert = {
-                'message': message,
-                'timestamp': datetime.now(),
-                'id': alert_id
-            }
-            
-            # 添加到警報列表
-            self.alerts.append(new_alert)
-            # 記錄已處理的警報ID
-            self.processed_alerts.add(alert_id)
-            
-            # 記錄到日誌
-            logging.info(f"新警報: {message}")
+    def add_alert(self, message, alert_key):
+        """添加新警報，同一 (交易對, 類型) 超出頻率時合併為重複計數"""
+        bucket = self._buckets.get(alert_key)
+        if bucket is None:
+            throttle = self.config.ALERTS['throttle']
+            bucket = TokenBucket(throttle['capacity'], throttle['refill_seconds'])
+            self._buckets[alert_key] = bucket
+        
+        last_alert = self._last_alert.get(alert_key)
+        if not bucket.consume() and last_alert is not None:
+            # 超出頻率：累加到最近一條相同警報上
+            last_alert['message'] = message
+            last_alert['timestamp'] = datetime.now()
+            last_alert['count'] += 1
             
-            # 保持警報列表在合理大小（只保留最新的5條）
-            if len(self.alerts) > 5:
-                self.alerts = self.alerts[-5:]
+            # 已被擠出顯示列表時重新放回
+            if not any(alert is last_alert for alert in self.alerts):
+                self.alerts.append(last_alert)
             
-            # 清理過期的處理記錄（可選）
-            if len(self.processed_alerts) > 1000:
-                # 只保留最近的警報ID
-                self.processed_alerts = set(alert['id'] for alert in self.alerts)
+            logging.debug(f"警報已合併: {message}")
+            return
+        
+        # 創建新警報
+        new_alert = {
+            'message': message,
+            'timestamp': datetime.now(),
+            'key': alert_key,
+            'count': 1
+        }
+        self.alerts.append(new_alert)
+        self._last_alert[alert_key] = new_alert
         
-    def perform_analysis(self):
+        # 記錄到日誌
+        logging.info(f"新警報: {message}")
+        
+    async def perform_analysis(self):
         """執行完整分析"""
-        for symbol in self.config.SYMBOLS_TO_MONITOR:
+        loop = asyncio.get_running_loop()
+        futures = {
+            loop.run_in_executor(self._pool, self.analyzer.analyze_trends, symbol): symbol
+            for symbol in self.config.SYMBOLS_TO_MONITOR
+        }
+        done, _ = await asyncio.wait(futures)
+        
+        # 結果在事件循環線程中處理，避免與顯示同時修改狀態
+        for future in done:
+            symbol = futures[future]
             try:
-                analysis = self.analyzer.analyze_trends(symbol)
+                analysis = future.result()
                 
                 if isinstance(analysis, dict):
                     self.last_analysis[symbol] = analysis
@@ -108,10 +172,9 @@ class CryptoRealtimeAgent:
                     technical_data = analysis.get('technical_data', {})
                     if technical_data.get('is_critical', False):
                         # 生成重要時刻警報
-                        alert_id = f"{symbol}_critical_{datetime.now().strftime('%Y%m%d_%H%M')}"
                         self.add_alert(
                             f"⚠️ {symbol} 出現重要信號！\n{analysis.get('analysis', '未有分析')}",
-                            alert_id
+                            (symbol, 'critical')
                         )
                         logging.info(f"{symbol} 出現重要信號")
                     
@@ -123,6 +186,8 @@ class CryptoRealtimeAgent:
             except Exception as e:
                 logging.error(f"分析 {symbol} 時出錯: {e}")
                 self.last_analysis[symbol] = self._get_default_analysis()
+        
+        self._dirty = True
     
     def _get_default_analysis(self):
         """獲取默認的分析結果"""
@@ -147,17 +212,15 @@ class CryptoRealtimeAgent:
             
             # 只在非重要時刻檢查基本警報
             if not technical_data.get('is_critical', False):
-                alert_id = f"{symbol}_{datetime.now().strftime('%Y%m%d_%H%M')}"
-                
                 # 檢查趨勢線突破
                 if technical_data.get('trend_line'):
                     trend_line = technical_data['trend_line']
                     threshold = self.config.TREND['breakout_threshold']
                     
-                    if current_price > trend_line * (1 + threshold) and alert_id not in self.processed_alerts:
-                        self.add_alert(f"🔔 {symbol} 向上突破趨勢線！當前價格: ${current_price:,.2f}", alert_id)
-                    elif current_price < trend_line * (1 - threshold) and alert_id not in self.processed_alerts:
-                        self.add_alert(f"⚠️ {symbol} 向下突破趨勢線！當前價格: ${current_price:,.2f}", alert_id)
+                    if current_price > trend_line * (1 + threshold):
+                        self.add_alert(f"🔔 {symbol} 向上突破趨勢線！當前價格: ${current_price:,.2f}", (symbol, 'trend_up'))
+                    elif current_price < trend_line * (1 - threshold):
+                        self.add_alert(f"⚠️ {symbol} 向下突破趨勢線！當前價格: ${current_price:,.2f}", (symbol, 'trend_down'))
 
     def generate_display(self):
         """生成顯示內容"""
@@ -220,42 +283,60 @@ class CryptoRealtimeAgent:
                     datetime.now().strftime('%H:%M:%S')
                 )
 
-        return display
+        if not self.alerts:
+            return display
+        
+        # 最新警報在上，重複的警報顯示次數
+        alert_lines = []
+        for alert in reversed(self.alerts):
+            line = f"{alert['timestamp'].strftime('%H:%M:%S')} {alert['message']}"
+            if alert['count'] > 1:
+                line += f" (×{alert['count']})"
+            alert_lines.append(line)
+        
+        return Group(display, Panel("\n".join(alert_lines), title="警報", border_style="red"))
+
+    def _refresh_display(self, live):
+        """數據有變化時才更新並重繪顯示"""
+        if self._dirty:
+            live.update(self.generate_display(), refresh=True)
+            self._dirty = False
 
-    def start(self):
+    async def _price_loop(self, live):
+        """每10秒更新價格"""
+        while True:
+            await asyncio.sleep(10)
+            await self.update_prices()
+            self._refresh_display(live)
+
+    async def _analysis_loop(self, live):
+        """每5分鐘執行一次完整分析"""
+        while True:
+            await asyncio.sleep(300)
+            await self.perform_analysis()
+            self._refresh_display(live)
+
+    async def start(self):
         """啟動代理"""
         logging.info("啟動加密貨幣監控代理...")
         
         # 初始執行分析
-        self.perform_analysis()
+        await self.perform_analysis()
         
-        # 使用 Rich 的 Live Display
-        with Live(self.generate_display(), refresh_per_second=1) as live:
+        # 使用 Rich 的 Live Display，關閉自動刷新，只在數據變化時重繪
+        with Live(self.generate_display(), auto_refresh=False) as live:
+            self._dirty = False
             try:
-                last_analysis_time = datetime.now()
-                last_price_update = datetime.now()
-                
-                while True:
-                    current_time = datetime.now()
-                    
-                    # 每10秒更新價格
-                    if (current_time - last_price_update).seconds >= 10:
-                        self.update_prices()
-                        last_price_update = current_time
-                    
-                    # 每5分鐘執行一次完整分析
-                    if (current_time - last_analysis_time).seconds >= 300:
-                        self.perform_analysis()
-                        last_analysis_time = current_time
-                    
-                    # 更新顯示
-                    live.update(self.generate_display())
-                    
-                    time.sleep(1)
-                    
-            except KeyboardInterrupt:
-                logging.info("正在關閉代理...")
+                await asyncio.gather(
+                    asyncio.create_task(self._price_loop(live)),
+                    asyncio.create_task(self._analysis_loop(live))
+                )
+            finally:
+                self._pool.shutdown(wait=False)
 
 if __name__ == "__main__":
     agent = CryptoRealtimeAgent()
-    agent.start()
\ No newline at end of file
+    try:
+        asyncio.run(agent.start())
+    except KeyboardInterrupt:
+        logging.info("正在關閉代理...")
@@ -1,16 +1,157 @@
 from unicorn_binance_rest_api import BinanceRestApiManager
 import pandas as pd
 import numpy as np
+import bottleneck as bn
+import httpx
+import orjson
+from numba import njit
+from collections import OrderedDict
 from datetime import datetime, timedelta
+import json
+import threading
 import openai
 import logging
 
+# 成交量均線週期（供重要時刻判斷使用）
+VOLUME_MA_PERIOD = 20
+
+
+@njit(cache=True, fastmath=True)
+def _rsi_wilder(close, period):
+    """以 Wilder 平滑法單次遍歷計算 RSI"""
+    n = close.shape[0]
+    rsi = np.full(n, np.nan, close.dtype)
+    if n <= period:
+        return rsi
+
+    avg_gain = 0.0
+    avg_loss = 0.0
+    for i in range(1, n):
+        change = np.float64(close[i]) - np.float64(close[i - 1])
+        gain = change if change > 0.0 else 0.0
+        loss = -change if change < 0.0 else 0.0
+
+        if i <= period:
+            # 前 period 根先取簡單平均作為初始值
+            avg_gain += gain / period
+            avg_loss += loss / period
+            if i < period:
+                continue
+        else:
+            avg_gain = (avg_gain * (period - 1) + gain) / period
+            avg_loss = (avg_loss * (period - 1) + loss) / period
+
+        if avg_loss == 0.0:
+            rsi[i] = 100.0
+        else:
+            rsi[i] = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+    return rsi
+
+
+@njit(parallel=False, cache=True)
+def _all_indicators(close, high, low, ma_periods, bb_period, bb_std, sr_period):
+    """單次遍歷同時計算多週期 MA、布林帶及支撐阻力位"""
+    n = close.shape[0]
+    n_ma = ma_periods.shape[0]
+
+    ma = np.full((n_ma, n), np.nan, close.dtype)
+    bb_middle = np.full(n, np.nan, close.dtype)
+    bb_upper = np.full(n, np.nan, close.dtype)
+    bb_lower = np.full(n, np.nan, close.dtype)
+    support = np.full(n, np.nan, close.dtype)
+    resistance = np.full(n, np.nan, close.dtype)
+    if n == 0:
+        return ma, bb_middle, bb_upper, bb_lower, support, resistance
+
+    # MA 的滾動和
+    ma_sums = np.zeros(n_ma)
+
+    # 布林帶的滾動和與平方和（以首個價格為基準平移，降低數值誤差）
+    # 輸入可能是 float32，累加一律使用 float64
+    shift = np.float64(close[0])
+    bb_sum = 0.0
+    bb_sum_sq = 0.0
+
+    # 支撐/阻力位的單調佇列（存放索引）
+    min_queue = np.empty(n, np.int64)
+    max_queue = np.empty(n, np.int64)
+    min_head = 0
+    min_tail = 0
+    max_head = 0
+    max_tail = 0
+
+    for i in range(n):
+        price = np.float64(close[i])
+
+        # 1. MA：O(1) 更新滾動和
+        for k in range(n_ma):
+            period = ma_periods[k]
+            ma_sums[k] += price
+            if i >= period:
+                ma_sums[k] -= close[i - period]
+            if i >= period - 1:
+                ma[k, i] = ma_sums[k] / period
+
+        # 2. 布林帶：滾動和與平方和，標準差與 pandas 一致使用 ddof=1
+        d = price - shift
+        bb_sum += d
+        bb_sum_sq += d * d
+        if i >= bb_period:
+            old = np.float64(close[i - bb_period]) - shift
+            bb_sum -= old
+            bb_sum_sq -= old * old
+        if i >= bb_period - 1:
+            mean = bb_sum / bb_period
+            var = (bb_sum_sq - bb_sum * mean) / (bb_period - 1)
+            std = np.sqrt(var) if var > 0.0 else 0.0
+            bb_middle[i] = mean + shift
+            bb_upper[i] = bb_middle[i] + std * bb_std
+            bb_lower[i] = bb_middle[i] - std * bb_std
+
+        # 3. 支撐位：最低價的滾動最小值
+        while min_tail > min_head and low[min_queue[min_tail - 1]] >= low[i]:
+            min_tail -= 1
+        min_queue[min_tail] = i
+        min_tail += 1
+        if min_queue[min_head] <= i - sr_period:
+            min_head += 1
+
+        # 4. 阻力位：最高價的滾動最大值
+        while max_tail > max_head and high[max_queue[max_tail - 1]] <= high[i]:
+            max_tail -= 1
+        max_queue[max_tail] = i
+        max_tail += 1
+        if max_queue[max_head] <= i - sr_period:
+            max_head += 1
+
+        if i >= sr_period - 1:
+            support[i] = low[min_queue[min_head]]
+            resistance[i] = high[max_queue[max_head]]
+
+    return ma, bb_middle, bb_upper, bb_lower, support, resistance
+
+
 class CryptoTrendAnalyzer:
     def __init__(self, config):
         self.config = config
         self.binance_client = BinanceRestApiManager()
+        # K線直接走 REST 並重用 HTTP/2 連接
+        self._http = httpx.Client(
+            base_url=self.config.BINANCE['base_url'],
+            http2=True,
+            timeout=self.config.BINANCE['timeout']
+        )
         openai.api_key = self.config.OPENAI_API_KEY
         
+        # K線及技術指標快取，避免每次分析重新下載和計算整段歷史
+        self._klines_cache = {}
+        self._indicators_cache = {}
+        
+        # 相同市場狀態的 AI 分析結果（LRU，最多128條）
+        self._ai_cache = OrderedDict()
+        self._ai_cache_lock = threading.Lock()
+        
     def get_historical_data(self, symbol, interval=None, days=None):
         """獲取歷史價格數據"""
         try:
@@ -26,102 +167,150 @@ class CryptoTrendAnalyzer:
             if not self.config.is_valid_symbol(symbol):
                 raise ValueError(f"無效的交易對: {symbol}")
             
-            klines = self.binance_client.get_historical_klines(
-                symbol=symbol,
-                interval=interval,
-                start_str=start_time
-            )
+            # 已有快取時只獲取增量數據
+            # 最後一根K線可能尚未收盤，從它開始重新獲取以覆蓋舊值
+            cache_key = (symbol, interval, days)
+            cached = self._klines_cache.get(cache_key)
+            if cached is not None and not cached.empty:
+                fetch_start = int(cached.index[-1].timestamp() * 1000)
+            else:
+                fetch_start = start_time
             
-            df = pd.DataFrame(klines, columns=[
-                'timestamp', 'open', 'high', 'low', 'close', 
-                'volume', 'close_time', 'quote_volume', 'trades',
-                'taker_base', 'taker_quote', 'ignore'
-            ])
+            klines = self._fetch_klines(symbol, interval, fetch_start)
+            df = self._klines_to_frame(klines)
             
-            df = df[['timestamp', 'open', 'high', 'low', 'close', 'volume']]
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            df[['open', 'high', 'low', 'close', 'volume']] = df[['open', 'high', 'low', 'close', 'volume']].astype(float)
-            df.set_index('timestamp', inplace=True)
+            if cached is not None:
+                df = pd.concat([cached, df])
+                df = df[~df.index.duplicated(keep='last')]
+                df = df[df.index >= pd.to_datetime(start_time, unit='ms')]
             
+            self._klines_cache[cache_key] = df
             return df
         
         except Exception as e:
             print(f"Error fetching historical data: {e}")
             return None
 
-    def calculate_technical_indicators(self, df):
-        """計算技術指標"""
-        df = df.copy()
+    def _fetch_klines(self, symbol, interval, start_time):
+        """分頁獲取 start_time 之後的所有K線"""
+        limit = self.config.BINANCE['klines_limit']
+        klines = []
         
-        # 計算多個MA週期
-        for period in self.config.INDICATORS['MA']['periods']:
-            df[f'MA{period}'] = df['close'].rolling(window=period).mean()
+        while True:
+            response = self._http.get('/api/v3/klines', params={
+                'symbol': symbol,
+                'interval': interval,
+                'startTime': start_time,
+                'limit': limit
+            })
+            response.raise_for_status()
+            page = orjson.loads(response.content)
+            klines.extend(page)
+            
+            if len(page) < limit:
+                return klines
+            start_time = page[-1][0] + 1
+
+    def _klines_to_frame(self, klines):
+        """將K線列表轉換為 DataFrame"""
+        arr = np.asarray(klines, dtype=object)
+        if arr.ndim != 2:
+            arr = np.empty((0, 6), dtype=object)
         
-        # 計算趨勢線
-        df['trend_line'] = self._calculate_trend_line(df['close'])
+        # 只取時間及 OHLCV 六列，直接轉為數值陣列
+        # 技術分析用 float32 精度已足夠，可減半記憶體流量
+        timestamps = arr[:, 0].astype(np.int64)
+        ohlcv = arr[:, 1:6].astype(np.float32)
         
-        # 計算支撐和阻力位
-        df['support'], df['resistance'] = self._calculate_support_resistance(df)
+        return pd.DataFrame(
+            ohlcv,
+            columns=['open', 'high', 'low', 'close', 'volume'],
+            index=pd.to_datetime(timestamps, unit='ms').rename('timestamp')
+        )
+
+    def calculate_technical_indicators(self, df):
+        """計算技術指標"""
+        close = df['close'].to_numpy()
+        high = df['high'].to_numpy()
+        low = df['low'].to_numpy()
+        volume = df['volume'].to_numpy()
         
-        # 計算布林帶
-        bb_period = self.config.INDICATORS['Bollinger']['period']
-        bb_std = self.config.INDICATORS['Bollinger']['std_dev']
-        df['BB_middle'] = df['close'].rolling(window=bb_period).mean()
-        std = df['close'].rolling(window=bb_period).std()
-        df['BB_upper'] = df['BB_middle'] + (std * bb_std)
-        df['BB_lower'] = df['BB_middle'] - (std * bb_std)
+        # 單次遍歷計算 MA、布林帶及支撐阻力位
+        ma_periods = self.config.INDICATORS['MA']['periods']
+        ma, bb_middle, bb_upper, bb_lower, support, resistance = _all_indicators(
+            close, high, low,
+            np.asarray(ma_periods, dtype=np.int64),
+            self.config.INDICATORS['Bollinger']['period'],
+            float(self.config.INDICATORS['Bollinger']['std_dev']),
+            self.config.INDICATORS['MA']['default_period']
+        )
         
-        # 計算RSI
-        rsi_period = self.config.INDICATORS['RSI']['period']
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=rsi_period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=rsi_period).mean()
-        rs = gain / loss
-        df['RSI'] = 100 - (100 / (1 + rs))
+        indicators = {f'MA{period}': ma[k] for k, period in enumerate(ma_periods)}
+        indicators.update({
+            'support': support,
+            'resistance': resistance,
+            'BB_middle': bb_middle,
+            'BB_upper': bb_upper,
+            'BB_lower': bb_lower,
+            # 計算RSI
+            'RSI': _rsi_wilder(close, self.config.INDICATORS['RSI']['period']),
+            # 成交量均線，數據不足一個週期時全為 NaN
+            f'vol_ma{VOLUME_MA_PERIOD}': (
+                bn.move_mean(volume, window=VOLUME_MA_PERIOD, min_count=VOLUME_MA_PERIOD)
+                if len(volume) >= VOLUME_MA_PERIOD
+                else np.full(len(volume), np.nan, volume.dtype)
+            )
+        })
+        df = df.assign(**indicators)
         
         # 檢測趨勢突破
         df['trend_break'] = self._detect_trend_breaks(df)
         
         return df
     
-    def _calculate_trend_line(self, prices):
-        """使用線性回歸計算趨勢線"""
+    def _calculate_trend_line(self, prices, window=None):
+        """使用最近 window 根K線的線性回歸計算當前趨勢線價格"""
+        window = window or self.config.ANALYSIS['default_days']
         if len(prices) < self.config.TREND['min_points']:
-            return pd.Series(index=prices.index, dtype=float)
+            return np.nan
             
-        x = np.arange(len(prices))
-        y = prices.values
+        y = prices.to_numpy(dtype=np.float64)[-window:]
+        n = len(y)
+        x = np.arange(n, dtype=np.float64)
         
-        coefficients = np.polyfit(x, y, 1)
-        trend_line = coefficients[0] * x + coefficients[1]
+        # 一次線性回歸的閉式解，x 的矩可直接由 n 算出
+        sx = n * (n - 1) / 2
+        sxx = (n - 1) * n * (2 * n - 1) / 6
+        sy = y.sum()
+        sxy = np.dot(x, y)
         
-        return trend_line
-    
-    def _calculate_support_resistance(self, df):
-        """計算支撐和阻力位"""
-        period = self.config.INDICATORS['MA']['default_period']
-        support = df['low'].rolling(window=period).min()
-        resistance = df['high'].rolling(window=period).max()
+        slope = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+        intercept = (sy - slope * sx) / n
         
-        return support, resistance
+        # 下游只需要最後一點的趨勢線值
+        return slope * (n - 1) + intercept
     
     def _detect_trend_breaks(self, df):
         """檢測趨勢突破"""
-        breaks = pd.Series(index=df.index, dtype=float)
+        close = df['close'].to_numpy()
+        resistance = df['resistance'].to_numpy()
+        support = df['support'].to_numpy()
         breakout_threshold = self.config.TREND['breakout_threshold']
         
+        breaks = np.zeros(len(close), dtype=np.int8)
+        
         # 向上突破
-        up_break = (df['close'] > df['resistance'].shift(1) * (1 + breakout_threshold)) & \
-                   (df['close'].shift(1) <= df['resistance'].shift(1))
+        up_break = (close[1:] > resistance[:-1] * (1 + breakout_threshold)) & \
+                   (close[:-1] <= resistance[:-1])
         
         # 向下突破
-        down_break = (df['close'] < df['support'].shift(1) * (1 - breakout_threshold)) & \
-                     (df['close'].shift(1) >= df['support'].shift(1))
+        down_break = (close[1:] < support[:-1] * (1 - breakout_threshold)) & \
+                     (close[:-1] >= support[:-1])
         
-        breaks[up_break] = 1    # 向上突破
-        breaks[down_break] = -1  # 向下突破
+        breaks[1:][up_break] = 1      # 向上突破
+        breaks[1:][down_break] = -1   # 向下突破
         
-        return breaks
+        return pd.Series(breaks, index=df.index)
     
     def analyze_trends(self, symbol, interval='1d', days=30):
         """分析趨勢並生成報告"""
@@ -141,21 +330,29 @@ class CryptoTrendAnalyzer:
                     'analysis': '無法獲取市場數據'
                 }
                 
-            # 計算指標
-            df = self.calculate_technical_indicators(df)
+            # 計算指標（K線數據未變時沿用上次結果）
+            signature = (df.index[-1], len(df), tuple(df.iloc[-1]))
+            cached = self._indicators_cache.get((symbol, interval))
+            if cached is not None and cached[0] == signature:
+                df = cached[1]
+            else:
+                df = self.calculate_technical_indicators(df)
+                self._indicators_cache[(symbol, interval)] = (signature, df)
             
             # 準備分析數據
-            current_price = df['close'].iloc[-1]
-            trend_line_value = df['trend_line'].iloc[-1]
-            support = df['support'].iloc[-1]
-            resistance = df['resistance'].iloc[-1]
-            rsi = df['RSI'].iloc[-1]
+            # 指標以 float32 計算，輸出給顯示及警報時轉回 float
+            current_price = float(df['close'].iloc[-1])
+            trend_line_value = float(self._calculate_trend_line(df['close']))
+            support = float(df['support'].iloc[-1])
+            resistance = float(df['resistance'].iloc[-1])
+            rsi = float(df['RSI'].iloc[-1])
             
             # 檢查是否是重要時刻
             is_critical = self._is_critical_moment(df, current_price, trend_line_value, support, resistance, rsi)
             
             # 檢查最近的趨勢突破
-            recent_breaks = df['trend_break'].dropna()[-5:]
+            trend_breaks = df['trend_break'].to_numpy()
+            recent_breaks = trend_breaks[trend_breaks != 0][-5:]
             break_analysis = "無明顯突破"
             if (recent_breaks == 1).any():
                 break_analysis = "最近出現向上突破"
@@ -201,66 +398,57 @@ class CryptoTrendAnalyzer:
     def _is_critical_moment(self, df, current_price, trend_line, support, resistance, rsi):
         """判斷是否是重要時刻"""
         try:
-            # 1. 檢查趨勢線突破
-            trend_break = False
-            if trend_line:
-                break_threshold = self.config.TREND['breakout_threshold']
-                if abs(current_price - trend_line) / trend_line > break_threshold:
-                    trend_break = True
-
-            # 2. 檢查支撐/阻力位突破
-            support_resistance_break = False
-            if support and resistance:
-                price_threshold = (resistance - support) * 0.02  # 2% 緩衝區
-                if abs(current_price - support) < price_threshold or \
-                abs(current_price - resistance) < price_threshold:
-                    support_resistance_break = True
-
-            # 3. 檢查 RSI 極值
-            rsi_extreme = False
-            if rsi is not None:
-                if rsi >= 70 or rsi <= 30:
-                    rsi_extreme = True
-
-            # 4. 檢查成交量異常
-            volume_spike = False
-            if not df['volume'].empty:
-                avg_volume = df['volume'].rolling(window=20).mean()
-                current_volume = df['volume'].iloc[-1]
-                if current_volume > avg_volume.iloc[-1] * 2:  # 成交量是平均的2倍
-                    volume_spike = True
-
+            break_threshold = self.config.TREND['breakout_threshold']
+            
+            # 一次取出底層陣列，與假突破檢查共用
+            high = df['high'].to_numpy()
+            low = df['low'].to_numpy()
+            close = df['close'].to_numpy()
+            current_volume = df['volume'].to_numpy()[-1]
+            avg_volume_last = df[f'vol_ma{VOLUME_MA_PERIOD}'].to_numpy()[-1]
+            
+            # 所有條件合併為一個布林向量，NaN 的比較結果均為 False
+            with np.errstate(divide='ignore', invalid='ignore'):
+                price = np.float64(current_price)
+                conditions = np.array([
+                    # 1. 趨勢線突破
+                    np.abs(price - trend_line) / trend_line > break_threshold,
+                    # 2. 接近支撐/阻力位（2% 緩衝區）
+                    min(np.abs(price - support), np.abs(price - resistance)) < (resistance - support) * 0.02,
+                    # 3. RSI 極值
+                    rsi >= 70,
+                    rsi <= 30,
+                    # 4. 成交量是平均的2倍
+                    current_volume > avg_volume_last * 2,
+                ])
+            
             # 5. 檢查假突破
-            fake_breakout = self._check_fake_breakout(df)
-
-            # 返回是否是重要時刻
-            return trend_break or support_resistance_break or rsi_extreme or volume_spike or fake_breakout
+            return bool(conditions.any()) or self._check_fake_breakout(
+                high, low, close, df['support'].to_numpy(), df['resistance'].to_numpy()
+            )
 
         except Exception as e:
             logging.error(f"判斷重要時刻時出錯: {e}")
             return False
 
-    def _check_fake_breakout(self, df):
+    def _check_fake_breakout(self, high, low, close, support, resistance):
         """檢查是否出現假突破"""
         try:
-            if len(df) < 3:
+            if len(close) < 3:
                 return False
 
-            # 獲取最近三根K線
-            last_three = df.tail(3)
-            
-            # 檢查上升假突破
-            resistance = df['resistance'].iloc[-3]
-            if (last_three['high'].iloc[0] > resistance and  # 第一根突破
-                last_three['close'].iloc[1] > resistance and  # 第二根維持
-                last_three['close'].iloc[2] < resistance):    # 第三根回落
+            # 檢查上升假突破（以最近三根K線為準）
+            level = resistance[-3]
+            if (high[-3] > level and    # 第一根突破
+                close[-2] > level and   # 第二根維持
+                close[-1] < level):     # 第三根回落
                 return True
 
             # 檢查下跌假突破
-            support = df['support'].iloc[-3]
-            if (last_three['low'].iloc[0] < support and    # 第一根突破
-                last_three['close'].iloc[1] < support and   # 第二根維持
-                last_three['close'].iloc[2] > support):     # 第三根回升
+            level = support[-3]
+            if (low[-3] < level and     # 第一根突破
+                close[-2] < level and   # 第二根維持
+                close[-1] > level):     # 第三根回升
                 return True
 
             return False
@@ -305,6 +493,18 @@ class CryptoTrendAnalyzer:
     def _perform_ai_analysis(self, symbol, technical_data, df):
         """在重要時刻執行 AI 分析"""
         try:
+            # 市場狀態未變時直接返回上次的分析
+            key = (
+                symbol,
+                round(technical_data['current_price'], 2),
+                round(technical_data['rsi'], 1),
+                technical_data['break_analysis']
+            )
+            with self._ai_cache_lock:
+                if key in self._ai_cache:
+                    self._ai_cache.move_to_end(key)
+                    return self._ai_cache[key]
+            
             # 準備更詳細的 prompt
             prompt = self._prepare_critical_prompt(symbol, technical_data, df)
             
@@ -319,7 +519,14 @@ class CryptoTrendAnalyzer:
                 max_tokens=self.config.OPENAI['max_tokens']
             )
             
-            return response.choices[0].message.content
+            analysis = response.choices[0].message.content
+            
+            with self._ai_cache_lock:
+                self._ai_cache[key] = analysis
+                if len(self._ai_cache) > 128:
+                    self._ai_cache.popitem(last=False)
+            
+            return analysis
             
         except Exception as e:
             logging.error(f"AI 分析生成失敗: {e}")
@@ -359,4 +566,19 @@ class CryptoTrendAnalyzer:
             return float(ticker['price'])
         except Exception as e:
             print(f"Error getting price: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    def get_realtime_prices(self, symbols):
+        """批量獲取即時價格（單次請求）"""
+        symbols = [symbol for symbol in symbols if self.config.is_valid_symbol(symbol)]
+        if not symbols:
+            return {}
+            
+        try:
+            tickers = self.binance_client.get_symbol_ticker(
+                symbols=json.dumps(symbols, separators=(',', ':'))
+            )
+            return {ticker['symbol']: float(ticker['price']) for ticker in tickers}
+        except Exception as e:
+            print(f"Error getting prices: {e}")
+            return {}
\ No newline at end of file